@@ -68,9 +68,13 @@ export interface ChatSession {
 export interface PaginatedResponse<T> {
     data: T[];
     pagination: {
-        offset: number;
+        /** Present for offset-based requests only */
+        offset?: number;
         limit: number;
-        total: number;
+        /** Present for offset-based requests only */
+        total?: number;
         hasMore: boolean;
+        /** Pass as `?cursor=` to fetch the next page */
+        nextCursor?: string | null;
     };
 }
@@ -0,0 +1,30 @@
+import { assert, assertEquals } from './testUtils.ts';
+import { cosineSimilarity, normalizeVector, parseSummaryAndTags } from './ai.ts';
+
+Deno.test('cosineSimilarity returns 1 for parallel vectors and 0 for orthogonal ones', () => {
+    assert(Math.abs(cosineSimilarity([1, 2, 3, 4, 5], [2, 4, 6, 8, 10]) - 1) < 1e-12);
+    assertEquals(cosineSimilarity([1, 0, 0, 0, 0, 0], [0, 1, 0, 0, 0, 0]), 0);
+});
+
+Deno.test('cosineSimilarity returns 0 for empty or zero vectors', () => {
+    assertEquals(cosineSimilarity([], [1, 2]), 0);
+    assertEquals(cosineSimilarity([0, 0, 0], [1, 2, 3]), 0);
+});
+
+Deno.test('normalizeVector scales to unit length and leaves zero vectors alone', () => {
+    const normalized = normalizeVector([3, 4]);
+    assert(Math.abs(normalized[0] - 0.6) < 1e-12);
+    assert(Math.abs(normalized[1] - 0.8) < 1e-12);
+    assertEquals(normalizeVector([0, 0]), [0, 0]);
+});
+
+Deno.test('parseSummaryAndTags reads summary and normalizes tags', () => {
+    const parsed = parseSummaryAndTags('{"summary": " A page. ", "tags": ["React", "react", " Hooks ", 3]}');
+    assertEquals(parsed, { summary: 'A page.', tags: ['react', 'hooks'] });
+});
+
+Deno.test('parseSummaryAndTags returns null for malformed responses', () => {
+    assertEquals(parseSummaryAndTags('not json'), null);
+    assertEquals(parseSummaryAndTags('{"tags": ["a"]}'), null);
+    assertEquals(parseSummaryAndTags('[]'), null);
+});
@@ -5,13 +5,37 @@ import {
     OPENAI_EMBED_MODEL,
     OPENAI_MODEL
 } from './env.ts';
+import { LruCache } from './lruCache.ts';
 
 const OPENAI_HEADERS = {
     Authorization: `Bearer ${OPENAI_API_KEY}`,
     'Content-Type': 'application/json'
 };
 
-async function callOpenAIChat(prompt: string): Promise<string> {
+// Each entry is one embedding (~12 KB for 1536 dims), so keep the cache small enough
+// for an edge isolate while still absorbing repeated questions within a warm instance.
+const EMBEDDING_CACHE_SIZE = 256;
+const embeddingCache = new LruCache<string, number[]>(EMBEDDING_CACHE_SIZE);
+
+/**
+ * Hex-encoded SHA-256 of a string.
+ */
+async function hashText(text: string): Promise<string> {
+    const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text));
+    return Array.from(new Uint8Array(digest), (byte) => byte.toString(16).padStart(2, '0')).join('');
+}
+
+async function embeddingCacheKey(text: string): Promise<string> {
+    // Include the model so changing OPENAI_EMBEDDING_MODEL never serves stale vectors
+    return `${OPENAI_EMBED_MODEL}:${await hashText(text)}`;
+}
+
+type GenerateOptions = {
+    /** Ask the model for a single JSON object instead of free text */
+    json?: boolean;
+};
+
+async function callOpenAIChat(prompt: string, options: GenerateOptions = {}): Promise<string> {
     if (!OPENAI_API_KEY) {
         throw new Error('OPENAI_API_KEY is not configured');
     }
@@ -21,7 +45,8 @@ async function callOpenAIChat(prompt: string): Promise<string> {
         body: JSON.stringify({
             model: OPENAI_MODEL,
             messages: [{ role: 'user', content: prompt }],
-            temperature: 0.1
+            temperature: 0.1,
+            ...(options.json ? { response_format: { type: 'json_object' } } : {})
         })
     });
     if (!response.ok) {
@@ -108,14 +133,31 @@ async function callOpenAIEmbedding(text: string): Promise<number[]> {
     }
     const payload = await response.json();
     const embedding = payload.data?.[0]?.embedding;
-    return Array.isArray(embedding) ? embedding.map((value: number) => Number(value)) : [];
+    return Array.isArray(embedding) ? normalizeVector(embedding.map((value: number) => Number(value))) : [];
 }
 
-export async function generateContent(prompt: string): Promise<string> {
+/**
+ * Scale a vector to unit length so similarity reduces to a plain dot product.
+ * OpenAI embeddings are already normalized, but compatible providers behind
+ * OPENAI_BASE_URL are not guaranteed to be.
+ */
+export function normalizeVector(values: number[]): number[] {
+    let norm = 0;
+    for (const value of values) {
+        norm += value * value;
+    }
+    if (!norm) {
+        return values;
+    }
+    const scale = 1 / Math.sqrt(norm);
+    return values.map((value) => value * scale);
+}
+
+export async function generateContent(prompt: string, options?: GenerateOptions): Promise<string> {
     if (AI_PROVIDER !== 'openai') {
         throw new Error(`Unsupported AI_PROVIDER: ${AI_PROVIDER}`);
     }
-    return await callOpenAIChat(prompt);
+    return await callOpenAIChat(prompt, options);
 }
 
 export async function* streamContent(prompt: string): AsyncGenerator<string, void, unknown> {
@@ -133,10 +175,19 @@ export async function embedText(text: string): Promise<number[]> {
         throw new Error(`Unsupported AI_PROVIDER: ${AI_PROVIDER}`);
     }
     const normalized = text.replace(/\s+/g, ' ').trim();
-    return await callOpenAIEmbedding(normalized);
+    const cacheKey = await embeddingCacheKey(normalized);
+    const cached = embeddingCache.get(cacheKey);
+    if (cached) {
+        return cached;
+    }
+    const embedding = await callOpenAIEmbedding(normalized);
+    if (embedding.length) {
+        embeddingCache.set(cacheKey, embedding);
+    }
+    return embedding;
 }
 
-import { summarizePrompt, tagsPrompt } from './prompts.ts';
+import { summarizePrompt, summaryAndTagsPrompt, tagsPrompt } from './prompts.ts';
 
 export function parseTags(raw: string): string[] {
     const tags = raw
@@ -179,8 +230,87 @@ export async function ensureTags(
     return parseTags(suggestion);
 }
 
+/**
+ * Parse the JSON object returned for summaryAndTagsPrompt.
+ * Returns null when the response is not the expected shape.
+ */
+export function parseSummaryAndTags(raw: string): { summary: string; tags: string[] } | null {
+    let parsed: unknown;
+    try {
+        parsed = JSON.parse(raw);
+    } catch {
+        return null;
+    }
+    if (!parsed || typeof parsed !== 'object') {
+        return null;
+    }
+    const { summary, tags } = parsed as { summary?: unknown; tags?: unknown };
+    if (typeof summary !== 'string') {
+        return null;
+    }
+    const tagList = Array.isArray(tags)
+        ? tags.filter((tag): tag is string => typeof tag === 'string').join(',')
+        : typeof tags === 'string' ? tags : '';
+    return { summary: summary.trim(), tags: parseTags(tagList) };
+}
+
+/**
+ * Fill in whichever of summary/tags is missing.
+ * When both are missing they are generated by a single JSON-mode completion so the
+ * content is only sent (and billed) once; otherwise this defers to ensureSummary/ensureTags.
+ */
+export async function ensureSummaryAndTags(
+    title: string,
+    rawContent: string,
+    url: string,
+    summary: string,
+    tags: string[]
+): Promise<{ summary: string; tags: string[] }> {
+    const hasSummary = Boolean(summary?.trim());
+    const hasTags = Boolean(tags && tags.length > 0);
+    if (hasSummary || hasTags) {
+        const [ensuredSummary, ensuredTags] = await Promise.all([
+            ensureSummary(title, rawContent, url, summary),
+            ensureTags(title, rawContent, tags)
+        ]);
+        return { summary: ensuredSummary, tags: ensuredTags };
+    }
+    const content = rawContent || `Title: ${title}\nURL: ${url}`;
+    try {
+        const response = await generateContent(summaryAndTagsPrompt(title, content, url), { json: true });
+        const parsed = parseSummaryAndTags(response);
+        if (parsed) {
+            return parsed;
+        }
+        console.error('Failed to parse summary/tags response, falling back to separate calls:', response);
+    } catch (error) {
+        // Some OpenAI-compatible providers (OPENAI_BASE_URL) reject response_format
+        console.error('JSON-mode summary/tags request failed, falling back to separate calls:', error);
+    }
+    const [ensuredSummary, ensuredTags] = await Promise.all([
+        ensureSummary(title, rawContent, url, ''),
+        ensureTags(title, rawContent, [])
+    ]);
+    return { summary: ensuredSummary, tags: ensuredTags };
+}
+
+/**
+ * Join the non-empty parts that make up a bookmark's embedding input.
+ */
+function embeddingSource(parts: Array<string | undefined>): string {
+    return parts.filter((part) => typeof part === 'string' && part.trim()).join('\n');
+}
+
+/**
+ * Hash identifying the embedding `parts` would produce. Stored as bookmarks.content_hash;
+ * like the cache key it includes the model, so switching models forces a re-embed.
+ */
+export async function embeddingContentHash(parts: Array<string | undefined>): Promise<string> {
+    return await hashText(`${OPENAI_EMBED_MODEL}:${embeddingSource(parts)}`);
+}
+
 export async function computeEmbedding(parts: Array<string | undefined>): Promise<number[]> {
-    const source = parts.filter((part) => typeof part === 'string' && part.trim()).join('\n');
+    const source = embeddingSource(parts);
     if (!source) {
         return [];
     }
@@ -1,5 +1,13 @@
 import { assert, assertEquals } from './testUtils.ts';
-import { normalizeTags, serializeBookmark, type BookmarkWithTags, type Tag } from './bookmarks.ts';
+import {
+    decodeCursor,
+    encodeCursor,
+    normalizeTags,
+    serializeBookmark,
+    serializeBookmarkListItem,
+    type BookmarkWithTags,
+    type Tag
+} from './bookmarks.ts';
 
 Deno.test('normalizeTags trims, lowercases, filters, and limits to five tags', () => {
     const input = ['  Foo ', 'Bar', 'FOO', 123, '', 'baz', 'qux', 'quux'];
@@ -43,3 +51,37 @@ Deno.test('serializeBookmark maps tags and omits embedding data', () => {
     assertEquals(serialized.updatedAt, row.updated_at);
     assert(!('embedding' in serialized));
 });
+
+Deno.test('encodeCursor round-trips through decodeCursor', () => {
+    const row = { id: '3f1c2b9e-8d4a-4c1e-9b7a-2e5d6f7a8b9c', created_at: '2024-02-01T00:00:00.123+00:00' };
+    const cursor = encodeCursor(row);
+
+    assert(!/[+/=]/.test(cursor));
+    assertEquals(decodeCursor(cursor), { createdAt: row.created_at, id: row.id });
+});
+
+Deno.test('decodeCursor rejects malformed cursors', () => {
+    assertEquals(decodeCursor('not-a-cursor'), null);
+    assertEquals(decodeCursor(btoa(JSON.stringify(['2024-02-01T00:00:00Z', 'x),id.gt.0']))), null);
+    assertEquals(decodeCursor(btoa(JSON.stringify(['yesterday', '3f1c2b9e-8d4a-4c1e-9b7a-2e5d6f7a8b9c']))), null);
+    assertEquals(decodeCursor(btoa(JSON.stringify(['2024-02-01 ("),x)', '3f1c2b9e-8d4a-4c1e-9b7a-2e5d6f7a8b9c']))), null);
+});
+
+Deno.test('serializeBookmarkListItem omits rawContent', () => {
+    const row: BookmarkWithTags = {
+        id: 'bookmark-1',
+        user_id: 'user',
+        title: 'Title',
+        url: 'https://example.com',
+        summary: 'Summary',
+        raw_content: null,
+        embedding: null,
+        created_at: '2024-02-01T00:00:00Z',
+        updated_at: '2024-02-02T00:00:00Z'
+    };
+
+    const item = serializeBookmarkListItem(row);
+    assert(!('rawContent' in item));
+    assertEquals(item.summary, 'Summary');
+    assertEquals(item.tags, []);
+});
@@ -11,6 +11,12 @@ export type BookmarkRow = {
     updated_at: string;
 };
 
+/** Columns needed to serialize a full bookmark; the embedding is never sent to clients */
+export const BOOKMARK_COLUMNS = 'id, user_id, title, url, summary, raw_content, created_at, updated_at';
+
+/** Columns for list views, which render neither raw content nor the embedding */
+export const BOOKMARK_LIST_COLUMNS = 'id, user_id, title, url, summary, created_at, updated_at';
+
 export type Tag = {
     id: string;
     user_id: string;
@@ -54,3 +60,61 @@ export function serializeBookmark(row: BookmarkWithTags) {
         updatedAt: row.updated_at
     };
 }
+
+/**
+ * Serialize a row loaded with BOOKMARK_LIST_COLUMNS. rawContent is left out entirely
+ * (rather than sent as '') so a client that PUTs a list item back doesn't clear the
+ * stored content.
+ */
+export function serializeBookmarkListItem(row: BookmarkWithTags) {
+    const { rawContent: _rawContent, ...item } = serializeBookmark(row);
+    return item;
+}
+
+export type BookmarkCursor = {
+    createdAt: string;
+    id: string;
+};
+
+const UUID_PATTERN = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i;
+// Timestamps as PostgREST serializes timestamptz. Date.parse alone is too lenient: V8
+// skips parenthesized comments, so it would accept strings containing `"`, `,` or `)`.
+const TIMESTAMP_PATTERN = /^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d{1,6})?(Z|[+-]\d{2}:\d{2})$/;
+
+/**
+ * Encode the (created_at, id) position of a row as an opaque keyset cursor.
+ */
+export function encodeCursor(row: { id: string; created_at: string }): string {
+    return btoa(JSON.stringify([row.created_at, row.id]))
+        .replace(/\+/g, '-')
+        .replace(/\//g, '_')
+        .replace(/=+$/, '');
+}
+
+/**
+ * Decode a cursor produced by encodeCursor. Returns null for anything malformed so the
+ * values can be interpolated into a PostgREST filter safely.
+ */
+export function decodeCursor(cursor: string): BookmarkCursor | null {
+    try {
+        const base64 = cursor.replace(/-/g, '+').replace(/_/g, '/');
+        const decoded = JSON.parse(atob(base64.padEnd(Math.ceil(base64.length / 4) * 4, '=')));
+        if (!Array.isArray(decoded) || decoded.length !== 2) {
+            return null;
+        }
+        const [createdAt, id] = decoded;
+        if (
+            typeof createdAt !== 'string' ||
+            !TIMESTAMP_PATTERN.test(createdAt) ||
+            Number.isNaN(Date.parse(createdAt))
+        ) {
+            return null;
+        }
+        if (typeof id !== 'string' || !UUID_PATTERN.test(id)) {
+            return null;
+        }
+        return { createdAt, id };
+    } catch {
+        return null;
+    }
+}
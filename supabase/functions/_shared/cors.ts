@@ -1,5 +1,12 @@
 import { ALLOWED_ORIGINS } from './env.ts';
 
+// Parsed once per isolate instead of on every request
+const ALLOWED_ORIGIN_LIST = ALLOWED_ORIGINS
+  ? ALLOWED_ORIGINS.split(',').map(o => o.trim())
+  : [];
+const ALLOW_HEADERS = 'authorization, x-client-info, apikey, content-type, x-webhook-secret';
+const ALLOW_METHODS = 'GET,POST,PUT,DELETE,OPTIONS';
+
 /**
  * Get CORS headers based on request origin.
  * If ALLOWED_ORIGINS is set, only allow those origins.
@@ -8,23 +15,18 @@ import { ALLOWED_ORIGINS } from './env.ts';
 export function getCorsHeaders(req?: Request): HeadersInit {
   let allowedOrigin = '*';
 
-  if (ALLOWED_ORIGINS) {
-    const origins = ALLOWED_ORIGINS.split(',').map(o => o.trim());
+  if (ALLOWED_ORIGIN_LIST.length > 0) {
     const requestOrigin = req?.headers.get('origin') ?? '';
 
-    if (origins.includes(requestOrigin)) {
-      allowedOrigin = requestOrigin;
-    } else if (origins.length > 0) {
-      // If origin not in allowed list, use first allowed origin
-      // This prevents access from unauthorized origins
-      allowedOrigin = origins[0];
-    }
+    // If origin not in allowed list, use first allowed origin
+    // This prevents access from unauthorized origins
+    allowedOrigin = ALLOWED_ORIGIN_LIST.includes(requestOrigin) ? requestOrigin : ALLOWED_ORIGIN_LIST[0];
   }
 
   return {
     'Access-Control-Allow-Origin': allowedOrigin,
-    'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type, x-webhook-secret',
-    'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
+    'Access-Control-Allow-Headers': ALLOW_HEADERS,
+    'Access-Control-Allow-Methods': ALLOW_METHODS
   };
 }
 
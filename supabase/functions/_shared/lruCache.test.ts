@@ -0,0 +1,26 @@
+import { assertEquals } from './testUtils.ts';
+import { LruCache } from './lruCache.ts';
+
+Deno.test('LruCache evicts the least recently used entry', () => {
+    const cache = new LruCache<string, number>(2);
+    cache.set('a', 1);
+    cache.set('b', 2);
+    cache.get('a');
+    cache.set('c', 3);
+
+    assertEquals(cache.get('a'), 1);
+    assertEquals(cache.get('b'), undefined);
+    assertEquals(cache.get('c'), 3);
+    assertEquals(cache.size, 2);
+});
+
+Deno.test('LruCache overwrites existing keys without evicting', () => {
+    const cache = new LruCache<string, number>(2);
+    cache.set('a', 1);
+    cache.set('b', 2);
+    cache.set('a', 10);
+
+    assertEquals(cache.get('a'), 10);
+    assertEquals(cache.get('b'), 2);
+    assertEquals(cache.size, 2);
+});
@@ -0,0 +1,40 @@
+/**
+ * Minimal LRU cache backed by Map insertion order.
+ * Reads move an entry to the most-recently-used end; inserts past capacity evict
+ * the least-recently-used entry.
+ */
+export class LruCache<K, V> {
+    private readonly entries = new Map<K, V>();
+
+    constructor(private readonly capacity: number) {
+        if (capacity < 1) {
+            throw new Error('LruCache capacity must be at least 1');
+        }
+    }
+
+    get size(): number {
+        return this.entries.size;
+    }
+
+    get(key: K): V | undefined {
+        if (!this.entries.has(key)) {
+            return undefined;
+        }
+        const value = this.entries.get(key) as V;
+        this.entries.delete(key);
+        this.entries.set(key, value);
+        return value;
+    }
+
+    set(key: K, value: V): void {
+        if (this.entries.has(key)) {
+            this.entries.delete(key);
+        } else if (this.entries.size >= this.capacity) {
+            const oldest = this.entries.keys().next();
+            if (!oldest.done) {
+                this.entries.delete(oldest.value);
+            }
+        }
+        this.entries.set(key, value);
+    }
+}
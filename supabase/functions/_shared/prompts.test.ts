@@ -0,0 +1,63 @@
+import { assert, assertEquals } from './testUtils.ts';
+import { buildSourcesText } from './prompts.ts';
+import { estimateTokens } from './tokenBudget.ts';
+
+function source(index: number, content?: string) {
+    return {
+        bookmark: {
+            title: `Title ${index}`,
+            url: `https://example.com/${index}`,
+            summary: `Summary ${index}`,
+            content
+        }
+    };
+}
+
+Deno.test('buildSourcesText includes short content as-is', () => {
+    const text = buildSourcesText([source(1, 'Full page text'), source(2)]);
+
+    assertEquals(
+        text,
+        '[S1] Title: Title 1\nURL: https://example.com/1\nContent:\nFull page text\n\n' +
+            '[S2] Title: Title 2\nURL: https://example.com/2\nSummary: Summary 2\n'
+    );
+});
+
+Deno.test('buildSourcesText falls back to summaries once content no longer fits', () => {
+    const longPage = 'word '.repeat(10000);
+    const text = buildSourcesText([
+        source(1, longPage),
+        source(2, longPage),
+        source(3, 'word '.repeat(1500)),
+        source(4, longPage),
+        source(5, longPage)
+    ]);
+
+    for (let index = 1; index <= 5; index += 1) {
+        assert(text.includes(`[S${index}] Title: Title ${index}`), `missing source ${index}`);
+    }
+    assert(!text.includes('Summary 3'));
+    assert(text.includes('Summary 4'));
+    assert(text.includes('Summary 5'));
+    assert(estimateTokens(text) <= 6000, `sources text too long: ${estimateTokens(text)} tokens`);
+});
+
+Deno.test('buildSourcesText lists only titles and URLs once the budget is spent', () => {
+    const longSummary = 'word '.repeat(2000);
+    const sources = Array.from({ length: 100 }, (_, index) => source(index + 1));
+    for (const item of sources) {
+        item.bookmark.summary = longSummary;
+    }
+    const text = buildSourcesText(sources);
+
+    assert(text.includes('[S100] Title: Title 100\nURL: https://example.com/100\n'));
+    // The budget plus one title/URL line per source
+    assert(estimateTokens(text) < 7500, `sources text too long: ${estimateTokens(text)} tokens`);
+});
+
+Deno.test('buildSourcesText budgets CJK content per character', () => {
+    const page = '中'.repeat(20000);
+    const text = buildSourcesText([1, 2, 3, 4].map((index) => source(index, page)));
+
+    assert(estimateTokens(text) <= 6100, `sources text too long: ${estimateTokens(text)} tokens`);
+});
@@ -1,3 +1,18 @@
+import { estimateTokens, truncateToTokens } from './tokenBudget.ts';
+
+// Content budgets in (estimated) tokens; roughly the previous 8000/4000 character limits
+const SUMMARY_CONTENT_TOKENS = 2000;
+const TAGS_CONTENT_TOKENS = 1000;
+
+// The RAG sources block shares SOURCES_TOKEN_BUDGET across all sources; a single long
+// page can take at most PER_SOURCE_TOKENS of it. Once less than MIN_CONTENT_TOKENS is
+// left, sources fall back to their summary (up to SUMMARY_FLOOR_TOKENS), and once the
+// budget is spent only their title and URL are listed.
+const SOURCES_TOKEN_BUDGET = 6000;
+const PER_SOURCE_TOKENS = 2000;
+const MIN_CONTENT_TOKENS = 200;
+const SUMMARY_FLOOR_TOKENS = 200;
+
 export function summarizePrompt(title: string, content: string, url: string): string {
     const parts = [
         'You are HyperMemo, a concise research assistant.',
@@ -12,7 +27,7 @@ export function summarizePrompt(title: string, content: string, url: string): st
         parts.push(`URL: ${url}`);
     }
     parts.push('Content:');
-    parts.push(content.slice(0, 8000));
+    parts.push(truncateToTokens(content, SUMMARY_CONTENT_TOKENS));
     return parts.join('\n');
 }
 
@@ -21,10 +36,29 @@ export function tagsPrompt(title: string, content: string): string {
         'Suggest up to 5 concise tags (single words) describing the following page. Return comma-separated words only.',
         `Title: ${title}`,
         'Content:',
-        content.slice(0, 4000)
+        truncateToTokens(content, TAGS_CONTENT_TOKENS)
     ].join('\n');
 }
 
+export function summaryAndTagsPrompt(title: string, content: string, url: string): string {
+    const parts = [
+        'You are HyperMemo, a concise research assistant.',
+        'Summarize the following content in a single paragraph and suggest up to 5 concise tags (single words) describing it.',
+        'Focus ONLY on the provided content. Do not include external information or meta-commentary.',
+        'If the content is empty or insufficient, describe the topic based on the title.',
+        'Respond with a JSON object only, in the form {"summary": "...", "tags": ["tag1", "tag2"]}.'
+    ];
+    if (title) {
+        parts.push(`Title: ${title}`);
+    }
+    if (url) {
+        parts.push(`URL: ${url}`);
+    }
+    parts.push('Content:');
+    parts.push(truncateToTokens(content, SUMMARY_CONTENT_TOKENS));
+    return parts.join('\n');
+}
+
 type ConversationMessage = {
     role: 'user' | 'assistant';
     content: string;
@@ -75,6 +109,37 @@ export function ragPrompt(
     return parts.join('\n');
 }
 
+type PromptSource = {
+    title: string;
+    url: string;
+    summary: string;
+    content?: string;
+};
+
+/**
+ * Format sources for ragPrompt as [S1], [S2], ... in order, using page content when it
+ * is available and fits the remaining budget, and the summary otherwise.
+ */
+export function buildSourcesText(matches: Array<{ bookmark: PromptSource }>): string {
+    let remaining = SOURCES_TOKEN_BUDGET;
+    return matches
+        .map(({ bookmark: source }, index) => {
+            const header = `[S${index + 1}] Title: ${source.title}\nURL: ${source.url}\n`;
+            remaining -= estimateTokens(header);
+            const budget = Math.min(PER_SOURCE_TOKENS, remaining);
+            let section = '';
+            if (source.content && budget >= MIN_CONTENT_TOKENS) {
+                section = `Content:\n${truncateToTokens(source.content, budget)}`;
+            } else if (remaining > 0) {
+                section = `Summary: ${truncateToTokens(source.summary, Math.max(budget, SUMMARY_FLOOR_TOKENS))}`;
+            }
+            remaining = Math.max(0, remaining - estimateTokens(section));
+            // Spent-budget sources keep their [S#] entry so citations still line up
+            return section ? `${header}${section}\n` : header;
+        })
+        .join('\n');
+}
+
 export function rerankPrompt(question: string, items: string): string {
     return [
         'You are a relevance filter. Given a user question and a list of bookmarks, identify which bookmarks are RELEVANT to the question.',
@@ -16,3 +16,16 @@ export function getPathParam(req: Request, prefix: string): string | null {
   const [first] = remainder.split('/');
   return first || null;
 }
+
+// Provided by the Supabase Edge Runtime; undefined under plain `deno run` / `deno test`
+declare const EdgeRuntime: { waitUntil(promise: Promise<unknown>): void } | undefined;
+
+/**
+ * Run `promise` after the response is sent. Registering it with EdgeRuntime.waitUntil
+ * keeps the worker alive until it settles instead of letting the runtime drop it.
+ */
+export function runInBackground(promise: PromiseLike<unknown>): void {
+  if (typeof EdgeRuntime !== 'undefined') {
+    EdgeRuntime.waitUntil(Promise.resolve(promise));
+  }
+}
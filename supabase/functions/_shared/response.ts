@@ -1,5 +1,12 @@
 import { getCorsHeaders, corsHeaders } from './cors.ts';
 
+// Headers for responses that don't need a per-request origin; built once and reused
+// (Response copies HeadersInit, so sharing the object is safe)
+const DEFAULT_JSON_HEADERS: HeadersInit = {
+  ...corsHeaders,
+  'Content-Type': 'application/json'
+};
+
 /**
  * Create a JSON response with CORS headers.
  * @param status HTTP status code
@@ -9,9 +16,24 @@ import { getCorsHeaders, corsHeaders } from './cors.ts';
 export function jsonResponse(status: number, payload: unknown, req?: Request): Response {
   return new Response(JSON.stringify(payload), {
     status,
-    headers: {
-      ...(req ? getCorsHeaders(req) : corsHeaders),
-      'Content-Type': 'application/json'
-    }
+    headers: req
+      ? { ...getCorsHeaders(req), 'Content-Type': 'application/json' }
+      : DEFAULT_JSON_HEADERS
   });
 }
+
+export const SSE_HEADERS: HeadersInit = {
+  ...corsHeaders,
+  'Content-Type': 'text/event-stream',
+  'Cache-Control': 'no-cache',
+  'Connection': 'keep-alive'
+};
+
+const sseEncoder = new TextEncoder();
+
+/**
+ * Encode one server-sent event carrying a JSON payload.
+ */
+export function sseEvent(payload: unknown): Uint8Array {
+  return sseEncoder.encode(`data: ${JSON.stringify(payload)}\n\n`);
+}
@@ -0,0 +1,37 @@
+import { assert, assertEquals } from './testUtils.ts';
+import { estimateTokens, truncateToTokens } from './tokenBudget.ts';
+
+Deno.test('estimateTokens rounds up at four characters per token', () => {
+    assertEquals(estimateTokens(''), 0);
+    assertEquals(estimateTokens('abcd'), 1);
+    assertEquals(estimateTokens('abcde'), 2);
+});
+
+Deno.test('estimateTokens counts CJK characters as one token each', () => {
+    assertEquals(estimateTokens('你好世界'), 4);
+    assertEquals(estimateTokens('こんにちは'), 5);
+    assertEquals(estimateTokens('中文 text'), 4);
+});
+
+Deno.test('truncateToTokens leaves text within budget untouched', () => {
+    assertEquals(truncateToTokens('short text', 10), 'short text');
+});
+
+Deno.test('truncateToTokens cuts at a word boundary near the limit', () => {
+    const text = 'alpha beta gamma delta epsilon zeta eta theta iota kappa lambda';
+    const truncated = truncateToTokens(text, 10);
+
+    assert(truncated.length <= 40);
+    assert(text.startsWith(truncated));
+    assertEquals(truncated, 'alpha beta gamma delta epsilon zeta eta');
+});
+
+Deno.test('truncateToTokens hard-cuts text without nearby whitespace', () => {
+    assertEquals(truncateToTokens('x'.repeat(100), 5), 'x'.repeat(20));
+    assertEquals(truncateToTokens('anything', 0), '');
+});
+
+Deno.test('truncateToTokens budgets CJK text per character', () => {
+    assertEquals(truncateToTokens('中'.repeat(100), 10), '中'.repeat(10));
+    assertEquals(truncateToTokens('中文' + 'a'.repeat(8), 3), '中文aaaa');
+});
@@ -0,0 +1,45 @@
+/**
+ * Approximate token budgeting for prompts.
+ * A full BPE tokenizer would add megabytes of rank tables to every cold start, so this
+ * estimates instead: ~4 characters per token for Latin-script text, and one token per
+ * character for CJK scripts, which tokenizers split roughly character by character.
+ */
+const CHARS_PER_TOKEN = 4;
+// Han, kana, Hangul, CJK compatibility ideographs and fullwidth forms
+const WIDE_CHARS = /[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]/g;
+const WIDE_CHAR = new RegExp(WIDE_CHARS.source);
+
+export function estimateTokens(text: string): number {
+    const wide = text.match(WIDE_CHARS)?.length ?? 0;
+    return wide + Math.ceil((text.length - wide) / CHARS_PER_TOKEN);
+}
+
+/**
+ * Truncate text to roughly `maxTokens`, preferring to cut at a whitespace boundary
+ * near the limit rather than mid-word.
+ */
+export function truncateToTokens(text: string, maxTokens: number): string {
+    if (estimateTokens(text) <= maxTokens) {
+        return text;
+    }
+    const budget = Math.max(0, Math.floor(maxTokens)) * CHARS_PER_TOKEN;
+    // Walk in quarter-token units: a narrow character costs 1, a wide one a full token
+    let used = 0;
+    let end = 0;
+    while (end < text.length) {
+        const cost = WIDE_CHAR.test(text[end]) ? CHARS_PER_TOKEN : 1;
+        if (used + cost > budget) {
+            break;
+        }
+        used += cost;
+        end += 1;
+    }
+    // Don't split a surrogate pair
+    if (end > 0 && /[\ud800-\udbff]/.test(text[end - 1])) {
+        end -= 1;
+    }
+    const cut = text.slice(0, end);
+    const boundary = cut.search(/\s\S*$/);
+    // Only back off to the boundary if it doesn't throw away much of the budget
+    return boundary > end * 0.9 ? cut.slice(0, boundary) : cut;
+}
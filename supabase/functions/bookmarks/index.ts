@@ -2,9 +2,17 @@ import { handleCors } from '../_shared/cors.ts';
 import { jsonResponse } from '../_shared/response.ts';
 import { requireUserId, supabaseAdmin } from '../_shared/supabaseClient.ts';
 import { readJson, getPathParam } from '../_shared/request.ts';
-import { normalizeTags, serializeBookmark } from '../_shared/bookmarks.ts';
+import {
+    BOOKMARK_COLUMNS,
+    BOOKMARK_LIST_COLUMNS,
+    decodeCursor,
+    encodeCursor,
+    normalizeTags,
+    serializeBookmark,
+    serializeBookmarkListItem
+} from '../_shared/bookmarks.ts';
 import type { BookmarkPayload, BookmarkRow, BookmarkWithTags, Tag } from '../_shared/bookmarks.ts';
-import { normalizeTagResult, syncBookmarkTags } from '../_shared/tagUtils.ts';
+import { getOrCreateTag, normalizeTagResult, syncBookmarkTags } from '../_shared/tagUtils.ts';
 
 type BookmarkRecord = Omit<BookmarkRow, 'user_id' | 'created_at' | 'updated_at'> & {
     user_id: string;
@@ -21,6 +29,12 @@ type TagAssociationWithBookmark = {
     tags?: Tag[] | Tag | null;
 };
 
+type BookmarkBatchPayload = {
+    items?: BookmarkPayload[];
+};
+
+const MAX_BATCH_SIZE = 100;
+
 function ensureTitleUrl(payload: BookmarkPayload): { title: string; url: string } {
     const title = (payload.title ?? '').trim();
     const url = (payload.url ?? '').trim();
@@ -33,7 +47,7 @@ function ensureTitleUrl(payload: BookmarkPayload): { title: string; url: string
 async function fetchBookmarkWithTags(bookmarkId: string, userId: string): Promise<BookmarkWithTags | null> {
     const { data: bookmark, error: bookmarkError } = await supabaseAdmin
         .from('bookmarks')
-        .select('*')
+        .select(BOOKMARK_COLUMNS)
         .eq('id', bookmarkId)
         .eq('user_id', userId)
         .single();
@@ -75,7 +89,9 @@ async function upsertBookmark(userId: string, payload: BookmarkPayload, existing
         embedding
     };
 
-    // 1. Save initial record
+    // 1. Save initial record. The write returns the stored row (including server-set
+    // timestamps), so no follow-up read is needed to build the response.
+    let saved: BookmarkRow;
     if (existingId) {
         const { data, error } = await supabaseAdmin
             .from('bookmarks')
@@ -83,26 +99,97 @@ async function upsertBookmark(userId: string, payload: BookmarkPayload, existing
                 title: record.title,
                 url: record.url,
                 summary: record.summary,
-                raw_content: record.raw_content,
+                // Metadata-only edits (tags, summary) omit rawContent; keep the stored
+                // content, and with it the content hash process-bookmark checks
+                ...(typeof payload.rawContent === 'string' ? { raw_content: record.raw_content } : {}),
                 // Don't update embedding yet if it's empty
             })
             .eq('id', existingId)
             .eq('user_id', userId)
-            .select()
+            .select(BOOKMARK_COLUMNS)
             .single();
         if (error || !data) throw new Error(error?.message ?? 'Failed to update bookmark');
+        saved = data as BookmarkRow;
     } else {
-        const { data, error } = await supabaseAdmin.from('bookmarks').insert(record).select().single();
+        const { data, error } = await supabaseAdmin.from('bookmarks').insert(record).select(BOOKMARK_COLUMNS).single();
         if (error || !data) throw new Error(error?.message ?? 'Failed to save bookmark');
+        saved = data as BookmarkRow;
     }
 
     // 2. Sync initial tags
-    await syncBookmarkTags(record.id, userId, initialTags);
+    const tagNames = [...new Set(initialTags)];
+    await syncBookmarkTags(record.id, userId, tagNames);
 
-    // 3. Prepare response
-    const initialBookmarkWithTags = await fetchBookmarkWithTags(record.id, userId);
-    if (!initialBookmarkWithTags) throw new Error('Failed to fetch bookmark');
-    return jsonResponse(200, serializeBookmark(initialBookmarkWithTags));
+    // 3. Prepare response: after the sync the bookmark's tags are exactly tagNames
+    return jsonResponse(200, { ...serializeBookmark(saved), tags: tagNames });
+}
+
+/**
+ * Insert many bookmarks with one bookmarks insert and one bookmark_tags insert.
+ * Each distinct tag name is resolved once for the whole batch. Summaries and
+ * embeddings are filled in by process-bookmark, same as single inserts.
+ */
+async function insertBookmarks(userId: string, payload: BookmarkBatchPayload): Promise<Response> {
+    const items = Array.isArray(payload.items) ? payload.items : [];
+    if (items.length === 0) {
+        return jsonResponse(400, { error: 'items must be a non-empty array' });
+    }
+    if (items.length > MAX_BATCH_SIZE) {
+        return jsonResponse(400, { error: `At most ${MAX_BATCH_SIZE} bookmarks can be saved per batch` });
+    }
+    // Reject bad items up front so one of them can't fail the whole insert with a 500
+    for (const [index, item] of items.entries()) {
+        if (!item || typeof item !== 'object' || Array.isArray(item)) {
+            return jsonResponse(400, { error: `items[${index}] must be an object` });
+        }
+        if (typeof item.title !== 'string' || !item.title.trim() || typeof item.url !== 'string' || !item.url.trim()) {
+            return jsonResponse(400, { error: `items[${index}]: title and url are required` });
+        }
+    }
+
+    const tagsByBookmark = new Map<string, string[]>();
+    const records: BookmarkRecord[] = items.map((item) => {
+        const { title, url } = ensureTitleUrl(item);
+        const id = item.id ?? crypto.randomUUID();
+        tagsByBookmark.set(id, [...new Set(normalizeTags(item.tags))]);
+        return {
+            id,
+            user_id: userId,
+            title,
+            url,
+            summary: (item.summary ?? '').trim(),
+            raw_content: (item.rawContent ?? '').trim(),
+            embedding: null
+        };
+    });
+
+    const { data: rows, error } = await supabaseAdmin.from('bookmarks').insert(records).select(BOOKMARK_COLUMNS);
+    if (error || !rows) {
+        throw new Error(error?.message ?? 'Failed to save bookmarks');
+    }
+
+    const tagNames = [...new Set([...tagsByBookmark.values()].flat())];
+    const tagIds = await Promise.all(tagNames.map((name) => getOrCreateTag(userId, name)));
+    const tagIdByName = new Map(tagNames.map((name, index) => [name, tagIds[index]]));
+    const associations = records.flatMap((record) =>
+        (tagsByBookmark.get(record.id) ?? []).map((name) => ({
+            bookmark_id: record.id,
+            tag_id: tagIdByName.get(name)
+        }))
+    );
+    if (associations.length > 0) {
+        const { error: tagError } = await supabaseAdmin.from('bookmark_tags').insert(associations);
+        if (tagError) {
+            throw new Error(tagError.message);
+        }
+    }
+
+    return jsonResponse(200, {
+        data: (rows as BookmarkRow[]).map((row) => ({
+            ...serializeBookmark(row),
+            tags: tagsByBookmark.get(row.id) ?? []
+        }))
+    });
 }
 
 async function deleteBookmark(userId: string, resourceId: string | null): Promise<Response> {
@@ -136,23 +223,44 @@ async function listBookmarks(userId: string, resourceId: string | null, req: Req
         return jsonResponse(200, serializeBookmark(bookmarkWithTags));
     }
 
-    // Parse pagination params from query string
+    // Parse pagination params from query string.
+    // `cursor` selects keyset pagination (stable and O(limit) at any depth);
+    // `offset` is kept for existing clients.
     const url = new URL(req.url);
+    const cursorParam = url.searchParams.get('cursor');
+    const cursor = cursorParam ? decodeCursor(cursorParam) : null;
+    if (cursorParam && !cursor) {
+        return jsonResponse(400, { error: 'Invalid cursor' });
+    }
     const offset = Math.max(0, Number.parseInt(url.searchParams.get('offset') ?? '0', 10) || 0);
     const limit = Math.min(MAX_LIMIT, Math.max(1, Number.parseInt(url.searchParams.get('limit') ?? String(DEFAULT_LIMIT), 10) || DEFAULT_LIMIT));
 
-    // Fetch bookmarks with pagination
-    const { data: bookmarks, error, count } = await supabaseAdmin
+    // Fetch bookmarks with pagination. Cursor pages skip the exact count and fetch one
+    // extra row to learn whether another page exists.
+    let query = supabaseAdmin
         .from('bookmarks')
-        .select('*', { count: 'exact' })
+        .select(BOOKMARK_LIST_COLUMNS, { count: cursor ? undefined : 'exact' })
         .eq('user_id', userId)
         .order('created_at', { ascending: false })
-        .range(offset, offset + limit - 1);
+        .order('id', { ascending: false });
+    if (cursor) {
+        query = query
+            .or(`created_at.lt."${cursor.createdAt}",and(created_at.eq."${cursor.createdAt}",id.lt.${cursor.id})`)
+            .limit(limit + 1);
+    } else {
+        query = query.range(offset, offset + limit - 1);
+    }
+    const { data: rows, error, count } = await query;
 
-    if (error || !bookmarks) {
+    if (error || !rows) {
         throw new Error(error?.message ?? 'Failed to load bookmarks');
     }
 
+    const hasMore = cursor ? rows.length > limit : offset + limit < (count ?? 0);
+    const bookmarks = cursor ? rows.slice(0, limit) : rows;
+    const lastBookmark = bookmarks.at(-1);
+    const nextCursor = hasMore && lastBookmark ? encodeCursor(lastBookmark) : null;
+
     // Fetch all tags for these bookmarks
     const bookmarkIds = bookmarks.map(b => b.id);
     const { data: tagAssociations } = bookmarkIds.length > 0
@@ -179,17 +287,16 @@ async function listBookmarks(userId: string, resourceId: string | null, req: Req
     // Combine bookmarks with their tags
     const bookmarksWithTags: BookmarkWithTags[] = bookmarks.map(bookmark => ({
         ...bookmark,
+        raw_content: null, // Not selected for lists; fetch /bookmarks/:id for content
+        embedding: null,
         tags: tagsByBookmark.get(bookmark.id) || []
     }));
 
     return jsonResponse(200, {
-        data: bookmarksWithTags.map(serializeBookmark),
-        pagination: {
-            offset,
-            limit,
-            total: count ?? 0,
-            hasMore: offset + limit < (count ?? 0)
-        }
+        data: bookmarksWithTags.map(serializeBookmarkListItem),
+        pagination: cursor
+            ? { limit, hasMore, nextCursor }
+            : { offset, limit, total: count ?? 0, hasMore, nextCursor }
     });
 }
 
@@ -210,6 +317,10 @@ Deno.serve(async (req: Request): Promise<Response> => {
             return await listBookmarks(userId, resourceId, req);
         }
         if (req.method === 'POST') {
+            if (resourceId === 'batch') {
+                const body = (await readJson<BookmarkBatchPayload>(req)) ?? {};
+                return await insertBookmarks(userId, body);
+            }
             const body = (await readJson<BookmarkPayload>(req)) ?? {};
             return await upsertBookmark(userId, body);
         }
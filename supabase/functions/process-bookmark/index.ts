@@ -1,5 +1,5 @@
 import { createClient } from "@supabase/supabase-js";
-import { computeEmbedding, ensureSummary, ensureTags } from '../_shared/ai.ts';
+import { computeEmbedding, embeddingContentHash, ensureSummaryAndTags } from '../_shared/ai.ts';
 import { syncBookmarkTags } from '../_shared/tagUtils.ts';
 import { WEBHOOK_SECRET } from '../_shared/env.ts';
 import { getCorsHeaders } from '../_shared/cors.ts';
@@ -14,6 +14,12 @@ const supabaseServiceKey = Deno.env.get('SUPABASE_SERVICE_ROLE_KEY') ?? '';
 
 const supabaseAdmin = createClient(supabaseUrl, supabaseServiceKey);
 
+// Stateless, so one instance serves every request handled by this isolate
+const turndownService = new TurndownService({
+    headingStyle: 'atx',
+    codeBlockStyle: 'fenced'
+});
+
 type BookmarkRecord = {
     id: string;
     user_id: string;
@@ -22,6 +28,7 @@ type BookmarkRecord = {
     summary: string | null;
     raw_content: string | null;
     embedding: string | null; // pgvector returns string or array
+    content_hash: string | null; // SHA-256 of the embedding model and input text
 };
 
 type WebhookPayload = {
@@ -131,11 +138,6 @@ async function fetchAndCleanContent(url: string): Promise<string | null> {
             return null;
         }
 
-        const turndownService = new TurndownService({
-            headingStyle: 'atx',
-            codeBlockStyle: 'fenced'
-        });
-
         const rawMarkdown = turndownService.turndown(article.content);
 
         // Clean up the markdown content
@@ -147,6 +149,23 @@ async function fetchAndCleanContent(url: string): Promise<string | null> {
     }
 }
 
+/**
+ * Compute the embedding for `parts`, or return `embedding: null` when the stored
+ * embedding was computed from identical input and can be kept as-is.
+ */
+async function resolveEmbedding(
+    record: BookmarkRecord,
+    parts: string[]
+): Promise<{ contentHash: string; embedding: number[] | null }> {
+    const contentHash = await embeddingContentHash(parts);
+    if (record.embedding && record.content_hash === contentHash) {
+        console.log(`Content unchanged for ${record.id}, reusing stored embedding`);
+        return { contentHash, embedding: null };
+    }
+    console.log(`Computing embedding for ${record.id}...`);
+    return { contentHash, embedding: await computeEmbedding(parts) };
+}
+
 async function processBookmarkRecord(record: BookmarkRecord) {
     console.log(`Processing bookmark: ${record.id}`);
 
@@ -165,31 +184,47 @@ async function processBookmarkRecord(record: BookmarkRecord) {
         }
     }
 
-    // 1. Fetch current tags (user might have added some)
+    // 1. Fetch current tags (user might have added some). Not overlapped with the page
+    // fetch: the insert webhook fires before the bookmarks function has synced the
+    // user's tags, so reading them immediately would usually see none.
     const currentTags = await fetchCurrentTags(id);
 
-    // 2. Generate AI content
+    // 2. Generate AI content (one completion when both summary and tags are missing), and
+    // 3. compute the embedding concurrently. The embedding is taken from title + content
+    // so it doesn't have to wait for the summary; only when there is no content does it
+    // fall back to embedding the generated summary after it arrives.
     console.log(`Generating summary and tags for ${id}...`);
-    const generatedSummary = await ensureSummary(title, rawContent, url, currentSummary);
-    const generatedTags = await ensureTags(title, rawContent, currentTags);
-
-    // 3. Compute Embedding
-    console.log(`Computing embedding for ${id}...`);
-    const embedding = await computeEmbedding([title, generatedSummary, rawContent]);
-
-    // 4. Update Bookmark Record
-    const { error: updateError } = await supabaseAdmin
-        .from('bookmarks')
-        .update({
-            summary: generatedSummary,
-            raw_content: rawContent,
-            embedding: embedding
-        })
-        .eq('id', id);
-
-    if (updateError) {
-        console.error('Failed to update bookmark:', updateError);
-        throw updateError;
+    const summaryAndTags = ensureSummaryAndTags(title, rawContent, url, currentSummary, currentTags);
+    const embeddingResult = rawContent.trim()
+        ? resolveEmbedding(record, [title, rawContent])
+        : summaryAndTags.then(({ summary }) => resolveEmbedding(record, [title, summary]));
+    const [
+        { summary: generatedSummary, tags: generatedTags },
+        { contentHash, embedding }
+    ] = await Promise.all([summaryAndTags, embeddingResult]);
+
+    // 4. Update Bookmark Record, unless reprocessing changed nothing. A no-op update
+    // would still bump updated_at and clear the user's cached RAG answers.
+    const unchanged = embedding === null &&
+        generatedSummary === (record.summary ?? '') &&
+        rawContent === (record.raw_content ?? '');
+    if (unchanged) {
+        console.log(`Bookmark ${id} is unchanged, skipping update`);
+    } else {
+        const { error: updateError } = await supabaseAdmin
+            .from('bookmarks')
+            .update({
+                summary: generatedSummary,
+                raw_content: rawContent,
+                content_hash: contentHash,
+                ...(embedding === null ? {} : { embedding })
+            })
+            .eq('id', id);
+
+        if (updateError) {
+            console.error('Failed to update bookmark:', updateError);
+            throw updateError;
+        }
     }
 
     // 5. Sync Tags (Add new ones, don't remove existing user tags)
@@ -232,13 +267,10 @@ Deno.serve(async (req: Request): Promise<Response> => {
         // 2. Check for User Request (Authorization header)
         const authHeader = req.headers.get('Authorization');
         if (authHeader) {
-            // Verify user
-            const supabaseClient = createClient(
-                supabaseUrl,
-                Deno.env.get('SUPABASE_ANON_KEY') ?? '',
-                { global: { headers: { Authorization: authHeader } } }
-            );
-            const { data: { user }, error } = await supabaseClient.auth.getUser();
+            // Verify user with the module-level admin client rather than building a
+            // new client (and auth state) for every request
+            const token = authHeader.replace(/^Bearer\s+/i, '').trim();
+            const { data: { user }, error } = await supabaseAdmin.auth.getUser(token);
 
             if (error || !user) {
                 return new Response(JSON.stringify({ error: "Unauthorized" }), { status: 401, headers: jsonHeaders });
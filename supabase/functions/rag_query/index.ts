@@ -1,9 +1,9 @@
-import { handleCors, corsHeaders } from '../_shared/cors.ts';
-import { jsonResponse } from '../_shared/response.ts';
+import { handleCors } from '../_shared/cors.ts';
+import { jsonResponse, SSE_HEADERS, sseEvent } from '../_shared/response.ts';
 import { requireUserId, supabaseAdmin } from '../_shared/supabaseClient.ts';
-import { readJson } from '../_shared/request.ts';
+import { readJson, runInBackground } from '../_shared/request.ts';
 import { embedText, streamContent, generateContent } from '../_shared/ai.ts';
-import { ragPrompt, rerankPrompt } from '../_shared/prompts.ts';
+import { buildSourcesText, ragPrompt, rerankPrompt } from '../_shared/prompts.ts';
 
 type ConversationMessage = {
     role: 'user' | 'assistant';
@@ -18,19 +18,24 @@ type RagPayload = {
     stream?: boolean;
 };
 
+// Search candidates carry only what ranking and the prompt use; raw content is
+// loaded just for direct bookmark queries (see DirectMatch).
 type RpcMatch = {
     id: string;
     user_id: string;
     title: string;
     url: string;
     summary: string;
-    raw_content: string;
     tags: string[];
     created_at: string;
     updated_at: string;
     similarity: number;
 };
 
+type DirectMatch = RpcMatch & {
+    raw_content: string;
+};
+
 type RagMatch = {
     bookmark: {
         id: string;
@@ -43,20 +48,22 @@ type RagMatch = {
     score: number;
 };
 
-/**
- * Build formatted sources text from matches for the RAG prompt
- * If content is available, use it instead of just the summary
- */
-function buildSourcesText(matches: RagMatch[]): string {
-    return matches
-        .map((match, index) => {
-            const contentSection = match.bookmark.content
-                ? `Content:\n${match.bookmark.content.slice(0, 8000)}` // Limit content to avoid token overflow
-                : `Summary: ${match.bookmark.summary}`;
-            return `[S${index + 1}] Title: ${match.bookmark.title}\nURL: ${match.bookmark.url}\n${contentSection}\n`;
-        })
-        .join('\n');
-}
+// Only the top RERANK_CANDIDATES rows are ever looked at (and just TOP_MATCHES on the
+// fast path), so ask pgvector for exactly that many instead of sorting extra rows.
+const RERANK_CANDIDATES = 20;
+const TOP_MATCHES = 5;
+
+// Semantic answer cache (rag_cache table): a question whose embedding is this close to
+// a recently answered one gets the stored answer. Bookmark changes clear a user's cache.
+const ANSWER_CACHE_THRESHOLD = 0.97;
+const ANSWER_CACHE_MAX_AGE = '1 day';
+
+type CachedAnswer = {
+    id: string;
+    answer: string;
+    matches: RagMatch[];
+    similarity: number;
+};
 
 /**
  * Resolve tag names to IDs
@@ -90,7 +97,7 @@ async function searchBookmarks(
     const { data, error } = await supabaseAdmin.rpc('match_bookmarks', {
         query_embedding: queryEmbedding,
         match_threshold: 0.1, // Low threshold to get enough candidates for re-ranking
-        match_count: 50,      // Fetch top 50 to allow for re-ranking
+        match_count: RERANK_CANDIDATES,
         filter_user_id: userId,
         filter_tag_ids: tagIds.length > 0 ? tagIds : null
     });
@@ -108,7 +115,7 @@ async function searchBookmarks(
 async function getBookmarksByIds(
     userId: string,
     bookmarkIds: string[]
-): Promise<RpcMatch[]> {
+): Promise<DirectMatch[]> {
     const { data, error } = await supabaseAdmin
         .from('bookmarks')
         .select(`
@@ -129,7 +136,7 @@ async function getBookmarksByIds(
         throw new Error(error.message);
     }
 
-    // Transform to RpcMatch format
+    // Transform to DirectMatch format
     return (data || []).map(b => ({
         id: b.id,
         user_id: b.user_id,
@@ -179,7 +186,7 @@ async function rerankBookmarksWithLLM(
     } catch (e) {
         console.error('Failed to parse rerank response:', response, e);
         // Fallback: return top 5 original matches if parsing fails
-        return matches.slice(0, 5).map(m => ({
+        return matches.slice(0, TOP_MATCHES).map(m => ({
             bookmark: {
                 id: m.id,
                 title: m.title,
@@ -220,6 +227,68 @@ async function rerankBookmarksWithLLM(
     return relevantMatches;
 }
 
+/**
+ * Answers depend only on the question and the user's bookmarks when there is no tag
+ * filter or conversation context, so only those queries are cached.
+ */
+function isCacheable(tags: string[], conversationHistory: ConversationMessage[]): boolean {
+    return tags.length === 0 && conversationHistory.length === 0;
+}
+
+/**
+ * Look up a fresh cached answer for a semantically equivalent question
+ */
+async function lookupCachedAnswer(userId: string, queryEmbedding: number[]): Promise<CachedAnswer | null> {
+    const { data, error } = await supabaseAdmin.rpc('match_rag_cache', {
+        query_embedding: queryEmbedding,
+        filter_user_id: userId,
+        match_threshold: ANSWER_CACHE_THRESHOLD,
+        max_age: ANSWER_CACHE_MAX_AGE
+    });
+
+    if (error) {
+        // The cache is an optimization; fall through to a normal query
+        console.error('Answer cache lookup failed:', error);
+        return null;
+    }
+
+    const hit = ((data || []) as CachedAnswer[])[0];
+    if (!hit) {
+        return null;
+    }
+
+    console.log(`Answer cache hit (similarity ${hit.similarity.toFixed(3)})`);
+    runInBackground(
+        supabaseAdmin.rpc('record_rag_cache_hit', { cache_id: hit.id }).then(({ error: hitError }) => {
+            if (hitError) console.error('Failed to record answer cache hit:', hitError);
+        })
+    );
+    return hit;
+}
+
+/**
+ * Store an answer in the semantic cache without delaying the response
+ */
+function storeCachedAnswer(
+    userId: string,
+    question: string,
+    queryEmbedding: number[],
+    answer: string,
+    matches: RagMatch[]
+): void {
+    if (!answer.trim()) {
+        return;
+    }
+    runInBackground(
+        supabaseAdmin
+            .from('rag_cache')
+            .insert({ user_id: userId, question, embedding: queryEmbedding, answer, matches })
+            .then(({ error }) => {
+                if (error) console.error('Failed to cache answer:', error);
+            })
+    );
+}
+
 /**
  * Main RAG query handler (non-streaming)
  */
@@ -270,12 +339,22 @@ async function handleRagQuery(
         return jsonResponse(200, { answer, matches });
     }
 
-    const queryEmbedding = await embedText(question);
+    // Embedding the question and resolving tag filters are independent round-trips
+    const [queryEmbedding, tagIds] = await Promise.all([
+        embedText(question),
+        resolveTagIds(userId, tags)
+    ]);
     if (!queryEmbedding.length) {
         return jsonResponse(400, { error: 'Unable to embed the question' });
     }
 
-    const tagIds = await resolveTagIds(userId, tags);
+    const cacheable = isCacheable(tags, conversationHistory);
+    if (cacheable) {
+        const cached = await lookupCachedAnswer(userId, queryEmbedding);
+        if (cached) {
+            return jsonResponse(200, { answer: cached.answer, matches: cached.matches });
+        }
+    }
 
     let matches: RagMatch[] = [];
 
@@ -288,7 +367,7 @@ async function handleRagQuery(
             // skip re-ranking to save latency and tokens.
             if (searchResults[0].similarity > 0.85) {
                 console.log('Top match similarity high enough, skipping re-ranking');
-                matches = searchResults.slice(0, 5).map(m => ({
+                matches = searchResults.slice(0, TOP_MATCHES).map(m => ({
                     bookmark: {
                         id: m.id,
                         title: m.title,
@@ -300,8 +379,7 @@ async function handleRagQuery(
                 }));
             } else {
                 // Rerank bookmarks using LLM
-                const candidates = searchResults.slice(0, 20);
-                matches = await rerankBookmarksWithLLM(question, candidates);
+                matches = await rerankBookmarksWithLLM(question, searchResults);
             }
         }
     }
@@ -310,6 +388,10 @@ async function handleRagQuery(
     const prompt = ragPrompt(question, buildSourcesText(matches), conversationHistory);
     const answer = await generateContent(prompt);
 
+    if (cacheable) {
+        storeCachedAnswer(userId, question, queryEmbedding, answer, matches);
+    }
+
     return jsonResponse(200, { answer, matches });
 }
 
@@ -331,21 +413,13 @@ async function handleRagQueryStream(
         if (directMatches.length === 0) {
             const body = new ReadableStream({
                 start(controller) {
-                    const encoder = new TextEncoder();
-                    controller.enqueue(encoder.encode(`data: ${JSON.stringify({ type: 'matches', matches: [] })}\n\n`));
-                    controller.enqueue(encoder.encode(`data: ${JSON.stringify({ type: 'content', content: 'Could not find the specified bookmarks.' })}\n\n`));
-                    controller.enqueue(encoder.encode(`data: ${JSON.stringify({ type: 'done' })}\n\n`));
+                    controller.enqueue(sseEvent({ type: 'matches', matches: [] }));
+                    controller.enqueue(sseEvent({ type: 'content', content: 'Could not find the specified bookmarks.' }));
+                    controller.enqueue(sseEvent({ type: 'done' }));
                     controller.close();
                 }
             });
-            return new Response(body, {
-                headers: {
-                    ...corsHeaders,
-                    'Content-Type': 'text/event-stream',
-                    'Cache-Control': 'no-cache',
-                    'Connection': 'keep-alive'
-                }
-            });
+            return new Response(body, { headers: SSE_HEADERS });
         }
 
         // Include raw_content for direct bookmark queries
@@ -379,42 +453,51 @@ async function handleRagQueryStream(
         // Stream response for direct bookmark queries
         const body = new ReadableStream({
             async start(controller) {
-                const encoder = new TextEncoder();
-
                 // First, send the matches
-                controller.enqueue(encoder.encode(`data: ${JSON.stringify({ type: 'matches', matches })}\n\n`));
+                controller.enqueue(sseEvent({ type: 'matches', matches }));
 
                 try {
                     // Stream the content
                     for await (const chunk of streamContent(prompt)) {
-                        controller.enqueue(encoder.encode(`data: ${JSON.stringify({ type: 'content', content: chunk })}\n\n`));
+                        controller.enqueue(sseEvent({ type: 'content', content: chunk }));
                     }
-                    controller.enqueue(encoder.encode(`data: ${JSON.stringify({ type: 'done' })}\n\n`));
+                    controller.enqueue(sseEvent({ type: 'done' }));
                 } catch (error) {
-                    controller.enqueue(encoder.encode(`data: ${JSON.stringify({ type: 'error', error: error instanceof Error ? error.message : 'Unknown error' })}\n\n`));
+                    controller.enqueue(sseEvent({ type: 'error', error: error instanceof Error ? error.message : 'Unknown error' }));
                 } finally {
                     controller.close();
                 }
             }
         });
 
-        return new Response(body, {
-            headers: {
-                ...corsHeaders,
-                'Content-Type': 'text/event-stream',
-                'Cache-Control': 'no-cache',
-                'Connection': 'keep-alive'
-            }
-        });
+        return new Response(body, { headers: SSE_HEADERS });
     }
 
     // Normal search flow
-    const queryEmbedding = await embedText(question);
+    // Embedding the question and resolving tag filters are independent round-trips
+    const [queryEmbedding, tagIds] = await Promise.all([
+        embedText(question),
+        resolveTagIds(userId, tags)
+    ]);
     if (!queryEmbedding.length) {
         return jsonResponse(400, { error: 'Unable to embed the question' });
     }
 
-    const tagIds = await resolveTagIds(userId, tags);
+    const cacheable = isCacheable(tags, conversationHistory);
+    if (cacheable) {
+        const cached = await lookupCachedAnswer(userId, queryEmbedding);
+        if (cached) {
+            const body = new ReadableStream({
+                start(controller) {
+                    controller.enqueue(sseEvent({ type: 'matches', matches: cached.matches }));
+                    controller.enqueue(sseEvent({ type: 'content', content: cached.answer }));
+                    controller.enqueue(sseEvent({ type: 'done' }));
+                    controller.close();
+                }
+            });
+            return new Response(body, { headers: SSE_HEADERS });
+        }
+    }
 
     if (tags.length === 0 || tagIds.length > 0) {
         // Search bookmarks using RPC
@@ -425,7 +508,7 @@ async function handleRagQueryStream(
             // skip re-ranking to save latency and tokens.
             if (searchResults[0].similarity > 0.85) {
                 console.log('Top match similarity high enough, skipping re-ranking');
-                matches = searchResults.slice(0, 5).map(m => ({
+                matches = searchResults.slice(0, TOP_MATCHES).map(m => ({
                     bookmark: {
                         id: m.id,
                         title: m.title,
@@ -437,8 +520,7 @@ async function handleRagQueryStream(
                 }));
             } else {
                 // Rerank bookmarks using LLM
-                const candidates = searchResults.slice(0, 20);
-                matches = await rerankBookmarksWithLLM(question, candidates);
+                matches = await rerankBookmarksWithLLM(question, searchResults);
             }
         }
     }
@@ -448,33 +530,29 @@ async function handleRagQueryStream(
 
     const body = new ReadableStream({
         async start(controller) {
-            const encoder = new TextEncoder();
-
             // First, send the matches
-            controller.enqueue(encoder.encode(`data: ${JSON.stringify({ type: 'matches', matches })}\n\n`));
+            controller.enqueue(sseEvent({ type: 'matches', matches }));
 
             try {
-                // Stream the content
+                // Stream the content, keeping a copy for the answer cache
+                const chunks: string[] = [];
                 for await (const chunk of streamContent(prompt)) {
-                    controller.enqueue(encoder.encode(`data: ${JSON.stringify({ type: 'content', content: chunk })}\n\n`));
+                    chunks.push(chunk);
+                    controller.enqueue(sseEvent({ type: 'content', content: chunk }));
+                }
+                controller.enqueue(sseEvent({ type: 'done' }));
+                if (cacheable) {
+                    storeCachedAnswer(userId, question, queryEmbedding, chunks.join(''), matches);
                 }
-                controller.enqueue(encoder.encode(`data: ${JSON.stringify({ type: 'done' })}\n\n`));
             } catch (error) {
-                controller.enqueue(encoder.encode(`data: ${JSON.stringify({ type: 'error', error: error instanceof Error ? error.message : 'Unknown error' })}\n\n`));
+                controller.enqueue(sseEvent({ type: 'error', error: error instanceof Error ? error.message : 'Unknown error' }));
             } finally {
                 controller.close();
             }
         }
     });
 
-    return new Response(body, {
-        headers: {
-            ...corsHeaders,
-            'Content-Type': 'text/event-stream',
-            'Cache-Control': 'no-cache',
-            'Connection': 'keep-alive'
-        }
-    });
+    return new Response(body, { headers: SSE_HEADERS });
 }
 
 /**
@@ -0,0 +1,78 @@
+-- Rewrite match_bookmarks so each candidate's cosine distance is computed once.
+-- The previous version evaluated `embedding <=> query_embedding` three times per row
+-- (threshold filter, similarity column, order by) and the threshold predicate kept the
+-- planner from walking the HNSW index in distance order.
+--
+-- The inner query now orders by the index operator and limits, so pgvector does the
+-- top-k selection inside the index scan; the threshold and tag aggregation are applied
+-- only to the (at most match_count) rows that come back.
+create or replace function match_bookmarks(
+  query_embedding vector(1536),
+  match_threshold float,
+  match_count int,
+  filter_user_id uuid,
+  filter_tag_ids uuid[] default null
+)
+returns table (
+  id uuid,
+  user_id uuid,
+  title text,
+  url text,
+  summary text,
+  raw_content text,
+  tags text[],
+  created_at timestamptz,
+  updated_at timestamptz,
+  similarity float
+)
+language sql
+stable
+as $$
+  select
+    c.id,
+    c.user_id,
+    c.title,
+    c.url,
+    c.summary,
+    c.raw_content,
+    coalesce(
+      (
+        select array_agg(t.name)
+        from bookmark_tags bt
+        join tags t on t.id = bt.tag_id
+        where bt.bookmark_id = c.id
+      ),
+      '{}'::text[]
+    ) as tags,
+    c.created_at,
+    c.updated_at,
+    1 - c.distance as similarity
+  from (
+    select
+      b.id,
+      b.user_id,
+      b.title,
+      b.url,
+      b.summary,
+      b.raw_content,
+      b.created_at,
+      b.updated_at,
+      b.embedding <=> query_embedding as distance
+    from public.bookmarks b
+    where b.user_id = filter_user_id
+    and b.embedding is not null
+    and (
+      filter_tag_ids is null
+      or
+      exists (
+        select 1 from bookmark_tags bt
+        where bt.bookmark_id = b.id
+        and bt.tag_id = any(filter_tag_ids)
+      )
+    )
+    order by b.embedding <=> query_embedding
+    limit match_count
+  ) c
+  where 1 - c.distance > match_threshold
+  order by c.distance;
+$$;
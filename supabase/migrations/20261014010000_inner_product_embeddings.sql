@@ -0,0 +1,94 @@
+-- Embeddings are now stored unit-normalized (see embedText in _shared/ai.ts), so cosine
+-- similarity is just the inner product and pgvector no longer has to compute both
+-- vector norms for every candidate.
+
+-- l2_normalize needs pgvector >= 0.7, and the later migrations in this series depend on
+-- halfvec, binary_quantize (0.7) and iterative index scans (0.8). Bring the extension up
+-- to the newest installed version before any of them run.
+alter extension vector update;
+
+-- Re-normalize any rows written before normalization was enforced at write time.
+-- Skip the updated_at trigger: this is a storage migration, not a user edit.
+alter table public.bookmarks disable trigger set_updated_at;
+update public.bookmarks
+set embedding = l2_normalize(embedding)
+where embedding is not null;
+alter table public.bookmarks enable trigger set_updated_at;
+
+-- Replace the cosine index with an inner-product index.
+drop index if exists bookmarks_embedding_idx;
+create index if not exists bookmarks_embedding_ip_idx
+  on public.bookmarks
+  using hnsw (embedding vector_ip_ops);
+
+-- `<#>` returns the negative inner product, so similarity is its negation.
+create or replace function match_bookmarks(
+  query_embedding vector(1536),
+  match_threshold float,
+  match_count int,
+  filter_user_id uuid,
+  filter_tag_ids uuid[] default null
+)
+returns table (
+  id uuid,
+  user_id uuid,
+  title text,
+  url text,
+  summary text,
+  raw_content text,
+  tags text[],
+  created_at timestamptz,
+  updated_at timestamptz,
+  similarity float
+)
+language sql
+stable
+as $$
+  select
+    c.id,
+    c.user_id,
+    c.title,
+    c.url,
+    c.summary,
+    c.raw_content,
+    coalesce(
+      (
+        select array_agg(t.name)
+        from bookmark_tags bt
+        join tags t on t.id = bt.tag_id
+        where bt.bookmark_id = c.id
+      ),
+      '{}'::text[]
+    ) as tags,
+    c.created_at,
+    c.updated_at,
+    -c.distance as similarity
+  from (
+    select
+      b.id,
+      b.user_id,
+      b.title,
+      b.url,
+      b.summary,
+      b.raw_content,
+      b.created_at,
+      b.updated_at,
+      b.embedding <#> query_embedding as distance
+    from public.bookmarks b
+    where b.user_id = filter_user_id
+    and b.embedding is not null
+    and (
+      filter_tag_ids is null
+      or
+      exists (
+        select 1 from bookmark_tags bt
+        where bt.bookmark_id = b.id
+        and bt.tag_id = any(filter_tag_ids)
+      )
+    )
+    order by b.embedding <#> query_embedding
+    limit match_count
+  ) c
+  where -c.distance > match_threshold
+  order by c.distance;
+$$;
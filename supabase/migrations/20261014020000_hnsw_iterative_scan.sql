@@ -0,0 +1,15 @@
+-- The HNSW index on bookmarks.embedding is shared by every user, while match_bookmarks
+-- filters by user_id (and optionally tags) after the index lookup. With a plain HNSW
+-- scan pgvector stops after hnsw.ef_search candidates, so for a user whose bookmarks are
+-- a small fraction of the table the filter can discard almost everything and the query
+-- silently returns fewer than match_count rows (or none).
+--
+-- Iterative index scans (pgvector >= 0.8) keep walking the graph until enough rows pass
+-- the filter, so the ANN index serves filtered top-k queries directly instead of the
+-- planner falling back to scoring every row of the user's bookmarks.
+-- The extension itself is updated in 20261014010000_inner_product_embeddings.sql.
+
+alter function match_bookmarks(vector, float, int, uuid, uuid[])
+  set hnsw.iterative_scan = 'strict_order';
+alter function match_bookmarks(vector, float, int, uuid, uuid[])
+  set hnsw.ef_search = 100;
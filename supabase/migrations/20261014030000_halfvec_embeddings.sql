@@ -0,0 +1,95 @@
+-- Store embeddings as half-precision vectors.
+-- halfvec keeps the same 1536 dimensions at 2 bytes per component instead of 4, which
+-- halves table/TOAST size and the HNSW index, so more of the index stays in memory and
+-- each distance computation reads half the bytes. Ranking quality for unit-norm text
+-- embeddings is effectively unchanged at fp16 precision.
+
+drop index if exists bookmarks_embedding_ip_idx;
+
+-- The column type change rewrites every row; skip the updated_at trigger.
+alter table public.bookmarks disable trigger set_updated_at;
+alter table public.bookmarks
+  alter column embedding type halfvec(1536)
+  using embedding::halfvec(1536);
+alter table public.bookmarks enable trigger set_updated_at;
+
+create index if not exists bookmarks_embedding_ip_idx
+  on public.bookmarks
+  using hnsw (embedding halfvec_ip_ops);
+
+-- The query parameter type changes, so the function has to be recreated rather than
+-- replaced. The iterative scan settings from the previous migration are carried over.
+drop function if exists match_bookmarks(vector, float, int, uuid, uuid[]);
+
+create function match_bookmarks(
+  query_embedding halfvec(1536),
+  match_threshold float,
+  match_count int,
+  filter_user_id uuid,
+  filter_tag_ids uuid[] default null
+)
+returns table (
+  id uuid,
+  user_id uuid,
+  title text,
+  url text,
+  summary text,
+  raw_content text,
+  tags text[],
+  created_at timestamptz,
+  updated_at timestamptz,
+  similarity float
+)
+language sql
+stable
+set hnsw.iterative_scan = 'strict_order'
+set hnsw.ef_search = 100
+as $$
+  select
+    c.id,
+    c.user_id,
+    c.title,
+    c.url,
+    c.summary,
+    c.raw_content,
+    coalesce(
+      (
+        select array_agg(t.name)
+        from bookmark_tags bt
+        join tags t on t.id = bt.tag_id
+        where bt.bookmark_id = c.id
+      ),
+      '{}'::text[]
+    ) as tags,
+    c.created_at,
+    c.updated_at,
+    -c.distance as similarity
+  from (
+    select
+      b.id,
+      b.user_id,
+      b.title,
+      b.url,
+      b.summary,
+      b.raw_content,
+      b.created_at,
+      b.updated_at,
+      b.embedding <#> query_embedding as distance
+    from public.bookmarks b
+    where b.user_id = filter_user_id
+    and b.embedding is not null
+    and (
+      filter_tag_ids is null
+      or
+      exists (
+        select 1 from bookmark_tags bt
+        where bt.bookmark_id = b.id
+        and bt.tag_id = any(filter_tag_ids)
+      )
+    )
+    order by b.embedding <#> query_embedding
+    limit match_count
+  ) c
+  where -c.distance > match_threshold
+  order by c.distance;
+$$;
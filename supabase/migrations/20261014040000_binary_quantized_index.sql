@@ -0,0 +1,90 @@
+-- Index bookmark embeddings by their binary quantization and rescore in full precision.
+-- binary_quantize() keeps one sign bit per dimension, so the HNSW graph stores 192 bytes
+-- per bookmark instead of 3 KB of halfvec, and candidate distances are Hamming popcounts.
+-- match_bookmarks over-fetches from that index and reranks the shortlist with the exact
+-- inner product on the stored halfvec, which keeps the returned order precise.
+
+drop index if exists bookmarks_embedding_ip_idx;
+create index if not exists bookmarks_embedding_bq_idx
+  on public.bookmarks
+  using hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops);
+
+create or replace function match_bookmarks(
+  query_embedding halfvec(1536),
+  match_threshold float,
+  match_count int,
+  filter_user_id uuid,
+  filter_tag_ids uuid[] default null
+)
+returns table (
+  id uuid,
+  user_id uuid,
+  title text,
+  url text,
+  summary text,
+  raw_content text,
+  tags text[],
+  created_at timestamptz,
+  updated_at timestamptz,
+  similarity float
+)
+language sql
+stable
+set hnsw.iterative_scan = 'strict_order'
+set hnsw.ef_search = 100
+as $$
+  select
+    c.id,
+    c.user_id,
+    c.title,
+    c.url,
+    c.summary,
+    c.raw_content,
+    coalesce(
+      (
+        select array_agg(t.name)
+        from bookmark_tags bt
+        join tags t on t.id = bt.tag_id
+        where bt.bookmark_id = c.id
+      ),
+      '{}'::text[]
+    ) as tags,
+    c.created_at,
+    c.updated_at,
+    -c.distance as similarity
+  from (
+    -- Exact rescoring of the quantized shortlist
+    select
+      s.id,
+      s.user_id,
+      s.title,
+      s.url,
+      s.summary,
+      s.raw_content,
+      s.created_at,
+      s.updated_at,
+      s.embedding <#> query_embedding as distance
+    from (
+      -- Over-fetch 4x from the binary-quantized index
+      select b.*
+      from public.bookmarks b
+      where b.user_id = filter_user_id
+      and b.embedding is not null
+      and (
+        filter_tag_ids is null
+        or
+        exists (
+          select 1 from bookmark_tags bt
+          where bt.bookmark_id = b.id
+          and bt.tag_id = any(filter_tag_ids)
+        )
+      )
+      order by binary_quantize(b.embedding)::bit(1536) <~> binary_quantize(query_embedding)
+      limit match_count * 4
+    ) s
+    order by s.embedding <#> query_embedding
+    limit match_count
+  ) c
+  where -c.distance > match_threshold
+  order by c.distance;
+$$;
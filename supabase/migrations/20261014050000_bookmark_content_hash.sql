@@ -0,0 +1,5 @@
+-- Hash of the embedding model plus the text each bookmark's embedding was computed from
+-- (title and content, or title and summary when there is no content). process-bookmark
+-- compares it before re-embedding, so reprocessing a bookmark whose content hasn't
+-- changed skips the embeddings call.
+alter table public.bookmarks add column if not exists content_hash text;
@@ -0,0 +1,92 @@
+-- Stop returning raw_content from match_bookmarks.
+-- rag_query only uses title/summary/tags of search candidates (for reranking and the
+-- prompt), yet every candidate's full page content was detoasted and shipped to the edge
+-- function. Direct bookmark queries still load content by id.
+--
+-- Changing the result columns requires dropping and recreating the function.
+drop function if exists match_bookmarks(halfvec, float, int, uuid, uuid[]);
+
+create function match_bookmarks(
+  query_embedding halfvec(1536),
+  match_threshold float,
+  match_count int,
+  filter_user_id uuid,
+  filter_tag_ids uuid[] default null
+)
+returns table (
+  id uuid,
+  user_id uuid,
+  title text,
+  url text,
+  summary text,
+  tags text[],
+  created_at timestamptz,
+  updated_at timestamptz,
+  similarity float
+)
+language sql
+stable
+set hnsw.iterative_scan = 'strict_order'
+set hnsw.ef_search = 100
+as $$
+  select
+    c.id,
+    c.user_id,
+    c.title,
+    c.url,
+    c.summary,
+    coalesce(
+      (
+        select array_agg(t.name)
+        from bookmark_tags bt
+        join tags t on t.id = bt.tag_id
+        where bt.bookmark_id = c.id
+      ),
+      '{}'::text[]
+    ) as tags,
+    c.created_at,
+    c.updated_at,
+    -c.distance as similarity
+  from (
+    -- Exact rescoring of the quantized shortlist
+    select
+      s.id,
+      s.user_id,
+      s.title,
+      s.url,
+      s.summary,
+      s.created_at,
+      s.updated_at,
+      s.embedding <#> query_embedding as distance
+    from (
+      -- Over-fetch 4x from the binary-quantized index
+      select
+        b.id,
+        b.user_id,
+        b.title,
+        b.url,
+        b.summary,
+        b.embedding,
+        b.created_at,
+        b.updated_at
+      from public.bookmarks b
+      where b.user_id = filter_user_id
+      and b.embedding is not null
+      and (
+        filter_tag_ids is null
+        or
+        exists (
+          select 1 from bookmark_tags bt
+          where bt.bookmark_id = b.id
+          and bt.tag_id = any(filter_tag_ids)
+        )
+      )
+      order by binary_quantize(b.embedding)::bit(1536) <~> binary_quantize(query_embedding)
+      limit match_count * 4
+    ) s
+    order by s.embedding <#> query_embedding
+    limit match_count
+  ) c
+  where -c.distance > match_threshold
+  order by c.distance;
+$$;
@@ -0,0 +1,151 @@
+-- Semantic cache of rag_query answers.
+-- Users often re-ask near-identical questions. rag_query stores each answer with the
+-- question's embedding, and a later question whose embedding is close enough (and
+-- recent enough) is answered from the cache, skipping the bookmark search, rerank and
+-- completion entirely.
+create table if not exists public.rag_cache (
+    id uuid primary key default gen_random_uuid(),
+    user_id uuid not null references auth.users (id) on delete cascade,
+    question text not null,
+    embedding halfvec(1536) not null,
+    answer text not null,
+    matches jsonb not null default '[]'::jsonb,
+    hit_count integer not null default 0,
+    created_at timestamptz not null default timezone('utc', now())
+);
+
+create index if not exists rag_cache_user_created_at_idx on public.rag_cache (user_id, created_at desc);
+create index if not exists rag_cache_embedding_idx
+  on public.rag_cache
+  using hnsw (embedding halfvec_ip_ops);
+
+-- Service role only: the cache is read and written by the rag_query Edge Function
+alter table public.rag_cache enable row level security;
+create policy "Service role only" on public.rag_cache for all using (auth.role() = 'service_role');
+
+-- Return the closest fresh cached answer for a user, if it clears the threshold.
+-- Embeddings are unit-normalized, so similarity is the inner product.
+create or replace function match_rag_cache(
+  query_embedding halfvec(1536),
+  filter_user_id uuid,
+  match_threshold float,
+  max_age interval
+)
+returns table (
+  id uuid,
+  answer text,
+  matches jsonb,
+  similarity float
+)
+language sql
+stable
+set hnsw.iterative_scan = 'strict_order'
+as $$
+  select c.id, c.answer, c.matches, -c.distance as similarity
+  from (
+    select r.id, r.answer, r.matches, r.embedding <#> query_embedding as distance
+    from public.rag_cache r
+    where r.user_id = filter_user_id
+    and r.created_at > timezone('utc', now()) - max_age
+    order by r.embedding <#> query_embedding
+    limit 1
+  ) c
+  where -c.distance > match_threshold;
+$$;
+
+create or replace function record_rag_cache_hit(cache_id uuid)
+returns void
+language sql
+as $$
+  update public.rag_cache set hit_count = hit_count + 1 where id = cache_id;
+$$;
+
+-- Cached answers (including the tag names in their matches) are only valid for the
+-- bookmarks they were computed from, so any change to a user's bookmarks or tags drops
+-- that user's cache. The triggers are statement-level: a 100-row batch insert runs one
+-- delete, not 100. Transition tables can't be shared by a multi-event trigger, so each
+-- event gets its own trigger, all exposing the affected rows as `changed_rows`.
+create or replace function public.invalidate_rag_cache()
+returns trigger
+language plpgsql
+security definer
+as $$
+begin
+  delete from public.rag_cache
+  where user_id in (select distinct user_id from changed_rows);
+  return null;
+end;
+$$;
+
+-- bookmark_tags has no user_id; resolve it through the tag.
+create or replace function public.invalidate_rag_cache_for_bookmark_tags()
+returns trigger
+language plpgsql
+security definer
+as $$
+begin
+  delete from public.rag_cache
+  where user_id in (
+    select distinct t.user_id
+    from changed_rows cr
+    join public.tags t on t.id = cr.tag_id
+  );
+  return null;
+end;
+$$;
+
+drop trigger if exists on_bookmark_changed_invalidate_rag_cache on public.bookmarks;
+drop trigger if exists on_bookmarks_inserted_invalidate_rag_cache on public.bookmarks;
+create trigger on_bookmarks_inserted_invalidate_rag_cache
+  after insert on public.bookmarks
+  referencing new table as changed_rows
+  for each statement
+  execute procedure public.invalidate_rag_cache();
+drop trigger if exists on_bookmarks_updated_invalidate_rag_cache on public.bookmarks;
+create trigger on_bookmarks_updated_invalidate_rag_cache
+  after update on public.bookmarks
+  referencing new table as changed_rows
+  for each statement
+  execute procedure public.invalidate_rag_cache();
+drop trigger if exists on_bookmarks_deleted_invalidate_rag_cache on public.bookmarks;
+create trigger on_bookmarks_deleted_invalidate_rag_cache
+  after delete on public.bookmarks
+  referencing old table as changed_rows
+  for each statement
+  execute procedure public.invalidate_rag_cache();
+
+-- Renaming or deleting a tag changes the names cached in matches[].bookmark.tags.
+-- Deletes need their own trigger: the bookmark_tags rows go through ON DELETE CASCADE,
+-- and by the time that trigger runs the parent tag (and its user_id) is already gone.
+drop trigger if exists on_tags_updated_invalidate_rag_cache on public.tags;
+create trigger on_tags_updated_invalidate_rag_cache
+  after update on public.tags
+  referencing new table as changed_rows
+  for each statement
+  execute procedure public.invalidate_rag_cache();
+drop trigger if exists on_tags_deleted_invalidate_rag_cache on public.tags;
+create trigger on_tags_deleted_invalidate_rag_cache
+  after delete on public.tags
+  referencing old table as changed_rows
+  for each statement
+  execute procedure public.invalidate_rag_cache();
+
+drop trigger if exists on_bookmark_tags_inserted_invalidate_rag_cache on public.bookmark_tags;
+create trigger on_bookmark_tags_inserted_invalidate_rag_cache
+  after insert on public.bookmark_tags
+  referencing new table as changed_rows
+  for each statement
+  execute procedure public.invalidate_rag_cache_for_bookmark_tags();
+drop trigger if exists on_bookmark_tags_deleted_invalidate_rag_cache on public.bookmark_tags;
+create trigger on_bookmark_tags_deleted_invalidate_rag_cache
+  after delete on public.bookmark_tags
+  referencing old table as changed_rows
+  for each statement
+  execute procedure public.invalidate_rag_cache_for_bookmark_tags();
+
+-- Expired entries are never served; purge them daily at 3:30 AM (UTC)
+select cron.schedule(
+  'cleanup-rag-cache',
+  '30 3 * * *',
+  $$delete from public.rag_cache where created_at < timezone('utc', now()) - interval '1 day'$$
+);